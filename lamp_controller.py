@@ -7,43 +7,19 @@ NEURO LAVA LAMP CONTROLLER - Main Entry Point
 
 import sys
 import argparse
-import struct
-import time # Import struct and time for quick commands
+import time # Import time for quick commands
 from src.controller import LavaLampController
-from src.cli import interactive_mode
-from src.gui import start_web_interface
+from src.modes import all_modes
+from src.modes.sync import build_music_scene_string
 from src.config import DEVICE_ID, LOCAL_KEY, DEVICE_IP, DEVICE_VERSION # IMPORTED credentials from config.py
 
-# --- Helper function used for building the scene string ---
-def _build_music_scene_string(colors, duration=60):
-    """
-    Builds the definitive cycling scene string based on the captured music mode format:
-    [ID=00][Count][Mode=01][Pad=00][Duration (2-byte)][Color Data (6 bytes each)]
-    """
-    scene = bytearray()
-    
-    scene.append(0x00)  # ID/Version
-    scene.append(len(colors))  # Color count (e.g., 0x02 for 2 colors)
-    scene.append(0x01)  # Mode: 0x01 is the magic byte for JUMP/MUSIC cycling!
-    scene.append(0x00)  # Padding/Flags
-    
-    # Duration (in 0.1s units)
-    duration_units = min(duration * 10, 65535)
-    scene.extend(struct.pack('>H', duration_units))
-    
-    # Colors (HSV, 2 bytes each, Big Endian)
-    for h, s, v in colors:
-        scene.extend(struct.pack('>H', h))
-        scene.extend(struct.pack('>H', s))
-        scene.extend(struct.pack('>H', v))
-    
-    return scene.hex()
 
 def _sync_stream_quick_command(lamp):
     """Activates the single-command 'Sync to Stream' mode for CLI/Quick use."""
     
-    colors = [(0, 1000, 1000)] # Use a single color for the minimal payload
-    scene_hex = _build_music_scene_string(colors)
+    colors = ((0, 1000, 1000),) # Use a single color for the minimal payload
+    # Captured cycling layout with a 60s duration (0.1s units)
+    scene_hex = build_music_scene_string(colors, duration_units=600)
 
     try:
         lamp.set_mode('music') 
@@ -56,6 +32,25 @@ def _sync_stream_quick_command(lamp):
         print(f"❌ Failed to activate sync: {e}")
 
 
+def _run_demo(lamp):
+    """Runs a short showcase of the basic, rainbow and random rainbow modes."""
+    for mode_name in ['basic_colors', 'rainbow', 'random_rainbow']:
+        if mode_name in all_modes:
+            all_modes[mode_name](lamp, duration=10)
+
+
+# Quick command dispatch table (command name -> handler(lamp)).
+# 'sync' overrides the mode registry entry with the CLI quick-sync sequence.
+QUICK_COMMANDS = {
+    **all_modes,
+    'sync': _sync_stream_quick_command,
+    'demo': _run_demo,
+}
+
+# Pre-rendered list printed after an unknown quick command
+_AVAILABLE_COMMANDS_HELP = "\nAvailable commands:\n" + "\n".join(f"  - {mode_name}" for mode_name in all_modes)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Control your Neuro Lava Lamp",
@@ -85,6 +80,7 @@ Examples:
     print("🔮 NEURO LAVA LAMP CONTROLLER")
     print("="*60 + "\n")
     
+    lamp = None
     try:
         # Initialize lamp controller using imported credentials
         lamp = LavaLampController(
@@ -97,27 +93,19 @@ Examples:
         # Start web interface mode
         if args.gui:
             print(f"🌐 Starting web interface on http://{args.host}:{args.port}")
+            # Imported lazily: the Flask stack is only needed for the web interface
+            from src.gui import start_web_interface
             start_web_interface(lamp, host=args.host, port=args.port)
             return
         
         # Quick command mode
         if args.command:
-            from src.modes import all_modes
-            
             cmd = args.command.lower()
+            handler = QUICK_COMMANDS.get(cmd)
             
-            if cmd == 'sync': # Handle the new 'sync' quick command
-                _sync_stream_quick_command(lamp)
-            
-            elif cmd == 'demo':
-                # Run all demos
-                for mode_name in ['basic_colors', 'rainbow', 'random_rainbow']:
-                    if mode_name in all_modes:
-                        all_modes[mode_name](lamp, duration=10)
-            
-            elif cmd in all_modes:
-                # Run specific mode
-                all_modes[cmd](lamp)
+            if handler:
+                # Run sync, the demo showcase, or a specific mode
+                handler(lamp)
             
             elif args.command.startswith('#'):
                 # Set specific color
@@ -126,13 +114,12 @@ Examples:
             
             else:
                 print(f"❌ Unknown command: {cmd}")
-                print("\nAvailable commands:")
-                for mode_name in all_modes.keys():
-                    print(f"  - {mode_name}")
+                print(_AVAILABLE_COMMANDS_HELP)
                 return
         
         else:
             # Interactive CLI mode
+            from src.cli import interactive_mode
             interactive_mode(lamp)
         
         print("\n✅ Done!")
@@ -143,6 +130,9 @@ Examples:
         print(f"\n❌ Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if lamp is not None:
+            lamp.close()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,7 @@
 # src/cli.py
+import os
+import sys
+import threading
 from src.modes import all_modes
 from src.scheduler import schedule_mode, LampScheduler # Import necessary scheduler functions
 
@@ -7,6 +10,142 @@ from src.scheduler import schedule_mode, LampScheduler # Import necessary schedu
 # For simplicity, we define a placeholder scheduler instance here.
 SCHEDULER = None 
 
+try:
+    import readline  # Line editing + history for input(); not available on Windows
+except ImportError:
+    readline = None
+
+# Command history persisted between interactive sessions
+HISTORY_FILE = os.path.expanduser('~/.neurolava_history')
+
+# Demo submenu: 1-based menu number -> mode function, and its pre-rendered menu text
+DEMOS = {str(i): mode for i, mode in enumerate(all_modes.values(), 1)}
+_DEMO_MENU = "\nWhich demo?\n" + "".join(f"  {i}. {mode_name}\n" for i, mode_name in enumerate(all_modes, 1))
+
+# Commands that leave a running demo alone: they only read state, or ('stop') end it themselves
+_PASSIVE_COMMANDS = {'status', 'list', 'demo', 'stop'}
+
+# Demo running in the background (so the prompt stays responsive) and its stop flag
+_effect_thread = None
+_effect_stop = threading.Event()
+
+
+def _start_effect(lamp, mode):
+    """Runs a mode in a background thread, stopping any demo already running."""
+    global _effect_thread, _effect_stop
+    _stop_effect()
+    stop_event = _effect_stop = threading.Event()
+    _effect_thread = threading.Thread(target=mode, args=(lamp,), kwargs={'stop_event': stop_event}, daemon=True)
+    _effect_thread.start()
+
+
+def _stop_effect():
+    """
+    Signals the background demo to stop and waits for it to finish, so its last
+    frame can't land after the next command. Returns True if a demo was running.
+    """
+    _effect_stop.set()
+    if _effect_thread is None or not _effect_thread.is_alive():
+        return False
+    # Effects only check the flag between frames, and a frame can block on the socket
+    _effect_thread.join()
+    return True
+
+
+def _run_demo_menu(lamp):
+    """Lists the available modes and runs the one picked by number or name."""
+    sys.stdout.write(_DEMO_MENU)
+    sys.stdout.flush()
+    
+    choice = input("demo> ").strip().lower()
+    mode = DEMOS.get(choice) or all_modes.get(choice)
+    if mode is None:
+        print("❌ Unknown demo")
+        return
+    _start_effect(lamp, mode)
+    print("▶️  Running in the background. Type 'stop' (or any lamp command) to end it.")
+
+
+def _stop_demo(lamp, args):
+    if _stop_effect():
+        print("⏹️  Demo stopped")
+
+
+def _print_status(lamp, args):
+    status = lamp.get_status()
+    print(f"\n{status}\n")
+
+
+# Interactive command table: verb -> (argument types, handler(lamp, args)).
+# Arguments are counted and converted from the types before the handler runs.
+COMMANDS = {
+    'on': ((), lambda lamp, args: lamp.turn_on()),
+    'off': ((), lambda lamp, args: lamp.turn_off()),
+    'sync': ((), lambda lamp, args: all_modes['sync'](lamp)),
+    'hex': ((str,), lambda lamp, args: lamp.set_color_hex(*args)),
+    'rgb': ((int, int, int), lambda lamp, args: lamp.set_color_rgb(*args)),
+    'hsv': ((int, int, int), lambda lamp, args: lamp.set_color_hsv(*args)),
+    'status': ((), _print_status),
+    'demo': ((), lambda lamp, args: _run_demo_menu(lamp)),
+    'schedule': ((), lambda lamp, args: schedule_mode(lamp)), # Enters the interactive scheduling menu
+    'list': ((), lambda lamp, args: print(SCHEDULER.list_schedules())), # Direct list access
+    'remove': ((int,), lambda lamp, args: SCHEDULER.remove_schedule(*args)), # Direct remove access (1-based)
+    'stop': ((), _stop_demo),
+}
+
+
+# Interactive mode banner and command help, built once at import
+_BANNER = "\n".join([
+    "\n" + "="*60,
+    "🎮 INTERACTIVE MODE",
+    "="*60,
+    "\nCommands:",
+    "  hex <color>        - Set color by hex (e.g., hex #FF0000)",
+    "  rgb <r> <g> <b>    - Set color by RGB (e.g., rgb 255 0 0)",
+    "  hsv <h> <s> <v>    - Set color by HSV (e.g., hsv 0 1000 1000)",
+    "  on                 - Turn lamp on",
+    "  off                - Turn lamp off",
+    "  sync               - Activate Stream Sync Mode 🎧",
+    "  status             - Show current status",
+    "  demo               - Browse and run effect modes",
+    "  stop               - Stop the running demo",
+    "  schedule           - Enter scheduling mode",
+    "  list               - Show scheduled commands",
+    "  remove <index>     - Remove scheduled command (1-based)",
+    "  quit               - Exit",
+    "\nSeparate several commands with ';' (e.g., on; hex #FF0000)",
+    "",
+])
+
+
+def _run_command(lamp, cmd):
+    """Runs one tokenized command. Returns False when the user asked to quit."""
+    if cmd[0] == 'quit' or cmd[0] == 'exit':
+        return False
+    
+    spec = COMMANDS.get(cmd[0])
+    if spec is None or len(cmd) - 1 != len(spec[0]):
+        print("❌ Unknown command or wrong arguments")
+        return True
+    
+    arg_types, handler = spec
+    try:
+        args = [convert(value) for convert, value in zip(arg_types, cmd[1:])]
+    except ValueError:
+        print(f"❌ Invalid arguments for '{cmd[0]}'. Expected: {' '.join(t.__name__ for t in arg_types)}")
+        return True
+    
+    if cmd[0] not in _PASSIVE_COMMANDS:
+        # Any command that drives the lamp takes over from a running demo
+        _stop_effect()
+    
+    try:
+        handler(lamp, args)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    return True
+
+
 def interactive_mode(lamp):
     """Interactive command-line control"""
     
@@ -16,61 +155,33 @@ def interactive_mode(lamp):
         SCHEDULER = LampScheduler(lamp)
         # Note: In a production app, the scheduler should be started once in main.py
 
-    print("\n" + "="*60)
-    print("🎮 INTERACTIVE MODE")
-    print("="*60)
-    print("\nCommands:")
-    print("  hex <color>        - Set color by hex (e.g., hex #FF0000)")
-    print("  rgb <r> <g> <b>    - Set color by RGB (e.g., rgb 255 0 0)")
-    print("  hsv <h> <s> <v>    - Set color by HSV (e.g., hsv 0 1000 1000)")
-    print("  on                 - Turn lamp on")
-    print("  off                - Turn lamp off")
-    print("  sync               - Activate Stream Sync Mode 🎧")
-    print("  status             - Show current status")
-    print("  schedule           - Enter scheduling mode")
-    print("  list               - Show scheduled commands") # New direct access
-    print("  remove <index>     - Remove scheduled command (1-based)") # New direct access
-    print("  quit               - Exit")
-    print()
+    print(_BANNER)
+    
+    if readline is not None and os.path.exists(HISTORY_FILE):
+        try:
+            readline.read_history_file(HISTORY_FILE)
+        except OSError as e:
+            print(f"⚠️ Failed to load command history: {e}")
     
-    while True:
+    running = True
+    while running:
         try:
-            cmd = input("lamp> ").strip().lower().split()
-            if not cmd:
-                continue
-            
-            if cmd[0] == 'quit' or cmd[0] == 'exit':
-                break
-            elif cmd[0] == 'on':
-                lamp.turn_on()
-            elif cmd[0] == 'off':
-                lamp.turn_off()
-            elif cmd[0] == 'sync':
-                all_modes['sync'](lamp)
-            elif cmd[0] == 'hex' and len(cmd) == 2:
-                lamp.set_color_hex(cmd[1])
-            elif cmd[0] == 'rgb' and len(cmd) == 4:
-                lamp.set_color_rgb(int(cmd[1]), int(cmd[2]), int(cmd[3]))
-            elif cmd[0] == 'hsv' and len(cmd) == 4:
-                lamp.set_color_hsv(int(cmd[1]), int(cmd[2]), int(cmd[3]))
-            elif cmd[0] == 'status':
-                status = lamp.get_status()
-                print(f"\n{status}\n")
-            elif cmd[0] == 'schedule':
-                schedule_mode(lamp) # Enters the interactive scheduling menu
-            elif cmd[0] == 'list': # Direct list access
-                print(SCHEDULER.list_schedules())
-            elif cmd[0] == 'remove' and len(cmd) == 2: # Direct remove access
-                try:
-                    index = int(cmd[1])
-                    SCHEDULER.remove_schedule(index)
-                except ValueError:
-                    print("❌ Invalid index. Please enter a number.")
-            else:
-                print("❌ Unknown command or wrong arguments")
+            line = input("lamp> ")
+            for part in line.split(';'):
+                cmd = part.strip().lower().split()
+                if cmd and not _run_command(lamp, cmd):
+                    running = False
+                    break
         
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n")
             break
-        except Exception as e:
-            print(f"❌ Error: {e}")
\ No newline at end of file
+    
+    # Whichever way the loop ended (quit, Ctrl-C, EOF), don't leave a demo driving the lamp
+    _stop_effect()
+    
+    if readline is not None:
+        try:
+            readline.write_history_file(HISTORY_FILE)
+        except OSError as e:
+            print(f"⚠️ Failed to save command history: {e}")
\ No newline at end of file
@@ -1,5 +1,5 @@
 import time
-import tinytuya
+import threading
 from src.utils import hex_to_hsv, hsv_to_tuya, rgb_to_tuya_hsv, InvalidHexError, _hsv_to_hex_display
 
 # --- Tuya Data Point (DP) IDs (Based on your working script: 20=switch, 21=mode) ---
@@ -10,6 +10,29 @@ DP_ID_SCENE = 25         # String: Scene data
 DP_ID_MUSIC_TOGGLE = 27  # NEW: Hypothesized toggle for Music/Sync mode activation
 # ---------------------------------
 
+# DPs whose repeated identical writes are dropped, for quiet (effect loop) writes only.
+# While an effect streams frames the controller is the one driving the lamp, so a repeat
+# is truly redundant. Direct user commands are always sent: the lamp's button or the Tuya
+# app can change power, mode or color behind the controller's back.
+_DEDUP_DPS = frozenset((DP_ID_MODE, DP_ID_COLOR))
+
+
+def _send_failed(result) -> bool:
+    """tinytuya reports send failures as a dict with an 'Error' key instead of raising."""
+    return isinstance(result, dict) and 'Error' in result
+
+# Tuya color strings for common colors at full brightness, resolved once at import.
+# Like set_color_hex, V comes from the brightness (100% -> 1000), not from the hex value.
+_PRESET_HEX = {
+    hex_color: hsv_to_tuya(*hex_to_hsv(hex_color)[:2], 1000)
+    for hex_color in ("#ff0000", "#00ff00", "#0000ff", "#ffffff",
+                      "#ffa500", "#800080", "#00ffff", "#ffff00", "#ff00ff")
+}
+
+STATUS_CACHE_TTL = 0.5   # Seconds a fetched device status is reused before asking the lamp again
+SOCKET_TIMEOUT = 5       # Seconds tinytuya waits for a device reply
+DRAIN_TIMEOUT = 0.1      # Seconds to wait for one more leftover reply when draining the socket
+
 
 class LavaLampController:
     """
@@ -19,6 +42,9 @@ class LavaLampController:
     
     def __init__(self, device_id: str, local_key: str, device_ip: str, version: float):
         """Initializes the Tuya device object and attempts connection."""
+        # Imported here so importing this module stays cheap; tinytuya pulls in its crypto stack
+        import tinytuya
+        
         print(f"🔌 Connecting to Tuya device at {device_ip}...")
         
         self._device = tinytuya.Device(
@@ -27,9 +53,21 @@ class LavaLampController:
             local_key=local_key,
             version=version
         )
-        self._device.set_socketTimeout(5)
+        self._device.set_socketTimeout(SOCKET_TIMEOUT)
+        # Keep one TCP connection open for all writes instead of reconnecting per command
+        self._device.set_socketPersistent(True)
+        self._device.set_socketRetryLimit(2)
+        # The persistent socket is shared by effect, scheduler and web threads; the lock
+        # also keeps a reply drain from interleaving with another thread's send
+        self._io_lock = threading.Lock()
+        self._unread_replies = False  # Quiet writes left device replies in the socket
         self._is_connected = False
         self._last_status = {}
+        self._last_dp = {}  # dp_id -> last value written (one slot per DP)
+        self._status_cache = None  # DPS dict from the last status() round-trip
+        self._status_cache_ts = 0.0
+        self.ack_pacing = 0.05  # Extra pause (s) after an acknowledged write
+        self.verbose = True  # Print a confirmation line for every command (quiet effect writes never print)
         
         tinytuya.set_debug(False)
         
@@ -47,31 +85,131 @@ class LavaLampController:
             self._device = None
             self._last_status = {'dps': {str(DP_ID_SWITCH): False, str(DP_ID_MODE): 'colour', str(DP_ID_COLOR): '000003e803e8'}} 
 
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+    def close(self):
+        """Closes the persistent device socket."""
+        if self._device is not None:
+            self._device.close()
+
+
+    def _drain_replies(self):
+        """
+        Reads and discards the replies that quiet (nowait) writes left unread.
+        On the persistent socket these would otherwise be read by the next status()
+        or acknowledged write instead of its own reply. Call with _io_lock held.
+        """
+        if not self._unread_replies:
+            return
+        self._device.set_socketTimeout(DRAIN_TIMEOUT)
+        try:
+            # receive() returns None once no reply arrives within the timeout
+            while self._device.receive() is not None:
+                pass
+        finally:
+            self._device.set_socketTimeout(SOCKET_TIMEOUT)
+        self._unread_replies = False
+
+
+    def _send(self, send, *args, nowait: bool):
+        """
+        Sends over the persistent socket and returns tinytuya's result.
+        tinytuya handles dropped sockets itself (reconnect + set_socketRetryLimit) and
+        reports failures as an error dict rather than raising, so no retry happens here.
+        """
+        with self._io_lock:
+            if nowait:
+                self._unread_replies = True
+            else:
+                # Otherwise an old ACK would be taken as this write's and end the wait early
+                self._drain_replies()
+            return send(*args, nowait=nowait)
+
+        
+    def _set_dp_value(self, dp_id: int, value, quiet: bool = False):
+        """
+        Helper to send a command to the device. Returns False if the send failed.
+        Waits for the device's acknowledgement, unless quiet=True (fire-and-forget for effect loops).
+        """
+        if quiet and dp_id in _DEDUP_DPS and self._last_dp.get(dp_id) == value:
+            # Lamp already holds this value; skip the network write
+            return True
         
-    def _set_dp_value(self, dp_id: int, value):
-        """Helper to send a command to the device."""
         if self._device is None:
             self._last_status.setdefault('dps', {})[str(dp_id)] = value
-            return 
+            self._last_dp[dp_id] = value
+            return True
         
         try:
-            self._device.set_value(dp_id, value, nowait=True)
-            time.sleep(0.3)
+            result = self._send(self._device.set_value, dp_id, value, nowait=quiet)
+            self._status_cache = None  # The lamp's state may have changed; refetch on next get_status
+            if _send_failed(result):
+                # Unknown device state: forget the slot so the next write isn't dropped
+                self._last_dp.pop(dp_id, None)
+                print(f"❌ Failed to send DP {dp_id} command: {result['Error']}")
+                return False
+            self._last_dp[dp_id] = value
+            if not quiet:
+                time.sleep(self.ack_pacing)
+            return True
         except Exception as e:
+            self._last_dp.pop(dp_id, None)
             print(f"❌ Failed to send DP {dp_id} command: {e}")
+            return False
+
+
+    def _set_dp_values(self, values: dict, quiet: bool = False):
+        """Helper to send several DPs to the device in a single payload. Returns False if the send failed."""
+        if quiet:
+            values = {dp_id: value for dp_id, value in values.items()
+                      if not (dp_id in _DEDUP_DPS and self._last_dp.get(dp_id) == value)}
+        if not values:
+            return True
+        
+        if self._device is None:
+            dps = self._last_status.setdefault('dps', {})
+            for dp_id, value in values.items():
+                dps[str(dp_id)] = value
+            self._last_dp.update(values)
+            return True
+        
+        try:
+            result = self._send(self._device.set_multiple_values, values, nowait=quiet)
+            self._status_cache = None
+            if _send_failed(result):
+                for dp_id in values:
+                    self._last_dp.pop(dp_id, None)
+                print(f"❌ Failed to send DPs {', '.join(map(str, values))} command: {result['Error']}")
+                return False
+            self._last_dp.update(values)
+            if not quiet:
+                time.sleep(self.ack_pacing)
+            return True
+        except Exception as e:
+            for dp_id in values:
+                self._last_dp.pop(dp_id, None)
+            print(f"❌ Failed to send DPs {', '.join(map(str, values))} command: {e}")
+            return False
 
 
-    def turn_on(self):
-        """Turns the lamp on and ensures it's in 'colour' mode."""
-        self._set_dp_value(DP_ID_SWITCH, True)
-        self._set_dp_value(DP_ID_MODE, 'colour')
-        print("💡 Lamp turned ON")
+    def turn_on(self, quiet: bool = False):
+        """Turns the lamp on and ensures it's in 'colour' mode. quiet=True is for effect loops."""
+        # Switch and mode go out in one payload (one round-trip instead of two)
+        if self._set_dp_values({DP_ID_SWITCH: True, DP_ID_MODE: 'colour'}, quiet=quiet) and self.verbose and not quiet:
+            print("💡 Lamp turned ON")
 
 
-    def turn_off(self):
-        """Turns the lamp off."""
-        self._set_dp_value(DP_ID_SWITCH, False)
-        print("🛑 Lamp turned OFF")
+    def turn_off(self, quiet: bool = False):
+        """Turns the lamp off. quiet=True is for effect loops."""
+        if self._set_dp_value(DP_ID_SWITCH, False, quiet=quiet) and self.verbose and not quiet:
+            print("🛑 Lamp turned OFF")
 
     
     def set_mode(self, mode: str):
@@ -81,37 +219,40 @@ class LavaLampController:
             print(f"❌ Invalid mode '{mode}'. Must be one of: {', '.join(valid_modes)}.")
             return
 
-        self._set_dp_value(DP_ID_MODE, mode)
-        print(f"🎭 Lamp mode set to {mode.upper()}")
+        if self._set_dp_value(DP_ID_MODE, mode) and self.verbose:
+            print(f"🎭 Lamp mode set to {mode.upper()}")
     
     
     def set_music_toggle(self, state: bool):
         """NEW: Toggles the music/sync start flag (DPS 27)."""
-        self._set_dp_value(DP_ID_MUSIC_TOGGLE, state)
-        print(f"⏯️  Sent DPS {DP_ID_MUSIC_TOGGLE} (Music Toggle): {state}")
+        if self._set_dp_value(DP_ID_MUSIC_TOGGLE, state):
+            print(f"⏯️  Sent DPS {DP_ID_MUSIC_TOGGLE} (Music Toggle): {state}")
 
 
     def set_scene_raw(self, scene_hex: str):
         """Sends raw scene data string to DPS 25."""
-        self._set_dp_value(DP_ID_SCENE, scene_hex)
-        print(f"🖼️ Raw scene data sent to DPS {DP_ID_SCENE}.")
-
-    # (Other methods like set_color_hex, get_status, etc., are omitted for brevity but remain unchanged)
+        if self._set_dp_value(DP_ID_SCENE, scene_hex):
+            print(f"🖼️ Raw scene data sent to DPS {DP_ID_SCENE}.")
 
     def set_color_hex(self, hex_color: str, brightness: int = 100):
         """Sets color using HEX code (e.g., #FF0000)."""
-        try:
-            hsv = hex_to_hsv(hex_color)
+        # Common color at full brightness: use the precomputed string
+        tuya_color_string = _PRESET_HEX.get(hex_color.lower()) if brightness == 100 else None
+        if tuya_color_string is None:
+            try:
+                h, s, _ = hex_to_hsv(hex_color)
+            except InvalidHexError as e:
+                print(f"❌ Error setting color: {e}")
+                return
             
             # Apply external brightness control (0-100) to V component
             v_scaled = int((brightness / 100) * 1000)
             v_tuya = max(1, min(1000, v_scaled)) 
-            
-            self.set_color_hsv(hsv['h'], hsv['s'], v_tuya)
+            tuya_color_string = hsv_to_tuya(h, s, v_tuya)
+        
+        # Sent raw on both paths so each prints the same single confirmation
+        if self.set_color_raw(tuya_color_string) and self.verbose:
             print(f"✨ Set color (HEX) to {hex_color} @ {brightness}%")
-            
-        except InvalidHexError as e:
-            print(f"❌ Error setting color: {e}")
 
     def set_color_rgb(self, r: int, g: int, b: int, brightness: int = 100):
         """Sets color using RGB values (0-255)."""
@@ -123,47 +264,100 @@ class LavaLampController:
             v_scaled = int((brightness / 100) * 1000)
             v_tuya = max(1, min(1000, v_scaled))
             
-            self.set_color_hsv(h, s, v_tuya)
-            print(f"✨ Set color (RGB) to R:{r} G:{g} B:{b} @ {brightness}%")
+            if self.set_color_hsv(h, s, v_tuya) and self.verbose:
+                print(f"✨ Set color (RGB) to R:{r} G:{g} B:{b} @ {brightness}%")
             
         except Exception as e:
             print(f"❌ Failed to process RGB command: {e}")
 
 
-    def set_color_hsv(self, h: int, s: int, v: int):
+    def set_color_hsv(self, h: int, s: int, v: int, quiet: bool = False):
         """
         Sets color using Tuya-native HSB/HSV values.
         h: 0-360, s: 0-1000, v: 0-1000 (V represents absolute brightness/value)
+        quiet=True skips waiting for the device, for effect loops that pace themselves.
+        Returns False if the color could not be sent.
         """
         try:
             # Format the HSB string (e.g., '008503e803e8') and send
             tuya_color_string = hsv_to_tuya(h, s, v)
+            if not self.set_color_raw(tuya_color_string, quiet=quiet):
+                return False
             
-            # Ensure mode is 'colour' before sending color data
-            self.set_mode('colour') # Use the new method
-            
-            # Send the color data on DP 24
-            self._set_dp_value(DP_ID_COLOR, tuya_color_string)
-            
-            hex_color_display = _hsv_to_hex_display(h, s, v)
-            print(f"🎨 Set color (HSV) to H:{h} S:{s} V:{v} ({hex_color_display})")
+            if self.verbose:
+                hex_color_display = _hsv_to_hex_display(h, s, v)
+                print(f"🎨 Set color (HSV) to H:{h} S:{s} V:{v} ({hex_color_display})")
+            return True
             
         except Exception as e:
             print(f"❌ Failed to send HSV command: {e}")
+            return False
+
+
+    def set_color_raw(self, tuya_color_string: str, quiet: bool = False):
+        """
+        Sends a pre-formatted Tuya HSB string (e.g., '008503e803e8') to DPS 24.
+        Lets effect loops reuse precomputed strings instead of re-formatting them.
+        Returns False if the send failed.
+        """
+        if quiet and self._last_dp.get(DP_ID_MODE) == 'colour':
+            # Effect loop already switched to 'colour': send only DP 24 (dropped if unchanged)
+            return self._set_dp_value(DP_ID_COLOR, tuya_color_string, quiet=quiet)
+        # Switch to 'colour' and send the color data in one multi-DP payload
+        return self._set_dp_values({DP_ID_MODE: 'colour', DP_ID_COLOR: tuya_color_string}, quiet=quiet)
+
+
+    def set_many_raw(self, colors, intervals, duration=None, stop_event=None):
+        """
+        Streams pre-formatted Tuya HSB strings, pacing them against monotonic deadlines
+        so send latency is absorbed instead of added to every sleep.
+        intervals (seconds) is cycled alongside colors. With a duration the colors are
+        cycled until it elapses, otherwise each is sent once. Stops early once stop_event is set.
+        """
+        set_color_raw = self.set_color_raw
+        n_colors, n_intervals = len(colors), len(intervals)
+        deadline = time.monotonic()
+        end = None if duration is None else deadline + duration
+        i = 0
+        while (i < n_colors) if end is None else (deadline < end):
+            if stop_event is not None and stop_event.is_set():
+                return
+            set_color_raw(colors[i % n_colors], quiet=True)
+            deadline += intervals[i % n_intervals]
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                if stop_event is None:
+                    time.sleep(remaining)
+                elif stop_event.wait(remaining):
+                    return
+            else:
+                # Fell behind (slow device); resync rather than bursting to catch up
+                deadline -= remaining
+            i += 1
 
 
     def get_status(self) -> dict:
         """
         Fetches and returns the current lamp status as a dictionary.
         NOTE: Returns the raw DPS dictionary for deep .
+        Repeated calls within STATUS_CACHE_TTL reuse the last fetch unless a command was sent.
         """
         if self._device is None:
             # Return simulation status
             return self._last_status.get('dps', {})
         
+        now = time.monotonic()
+        if self._status_cache is not None and now - self._status_cache_ts < STATUS_CACHE_TTL:
+            return self._status_cache
+        
         try:
             # Refresh status from device
-            current_status = self._device.status()
+            with self._io_lock:
+                # Another poller may have refreshed the cache while we waited for the socket
+                if self._status_cache is not None and time.monotonic() - self._status_cache_ts < STATUS_CACHE_TTL:
+                    return self._status_cache
+                self._drain_replies()
+                current_status = self._device.status()
             if not current_status:
                 return {}
             
@@ -171,6 +365,10 @@ class LavaLampController:
             
             # Store the raw dictionary
             self._last_status = dps_raw 
+            self._status_cache = dps_raw
+            self._status_cache_ts = now
+            # The lamp may have been changed from elsewhere; forget remembered writes
+            self._last_dp.clear()
             
             return dps_raw
             
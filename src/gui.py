@@ -1,15 +1,38 @@
+import os
 import time
+import json
+import hashlib
 import logging 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import threading
-from src.modes import all_modes
+from concurrent.futures import ThreadPoolExecutor
+from src.modes import all_modes, stream_sync
 from src.scheduler import LampScheduler # Import the scheduler class
 
+# Drop werkzeug access logging outright so records are never built or formatted.
+# Done once at import so restarting the server doesn't reconfigure the logger.
+_werkzeug_log = logging.getLogger('werkzeug')
+_werkzeug_log.handlers[:] = [logging.NullHandler()]
+_werkzeug_log.setLevel(logging.ERROR)
+_werkzeug_log.propagate = False
+
+try:
+    import orjson  # Optional: C-implemented JSON for API requests/responses
+except ImportError:
+    orjson = None
+
 # Global instance of the scheduler
 lamp_scheduler = None
 # Global lamp controller instance
 lamp_controller = None
+# Single reusable worker for effects and sync toggles, so two modes never drive the lamp at once,
+# and the event that tells the running effect to stop before the next one starts
+_effect_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lava-effect')
+_effect_stop = threading.Event()
+# Guards the stop-event swap and submit, since the server handles requests on several threads
+_effect_lock = threading.Lock()
 
 
 app = Flask(__name__, 
@@ -18,6 +41,52 @@ app = Flask(__name__,
 CORS(app)
 
 
+class _OrjsonProvider(DefaultJSONProvider):
+    """Routes request.get_json() (and any remaining Flask JSON) through orjson."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
+
+
+def _fj(obj, status=200):
+    """Builds a JSON response, encoding straight to bytes with orjson when available."""
+    body = orjson.dumps(obj) if orjson is not None else json.dumps(obj)
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _json_body():
+    """Returns the request's JSON object, or None if the body is missing, malformed or not an object."""
+    data = request.get_json(cache=True, silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def _invalid_body():
+    """400 response for requests whose body is not a JSON object."""
+    return _fj({'success': False, 'error': 'Invalid JSON body'}, 400)
+
+
+def _stop_effect():
+    """Tells the running (or queued) effect to stop."""
+    with _effect_lock:
+        _effect_stop.set()
+
+
+def _submit_effect(fn, *args, **kwargs):
+    """Stops the current effect and queues fn(*args, stop_event=<new event>, **kwargs) on the worker."""
+    global _effect_stop
+    with _effect_lock:
+        _effect_stop.set()
+        stop_event = _effect_stop = threading.Event()
+        _effect_pool.submit(fn, *args, stop_event=stop_event, **kwargs)
+
+
 # --- SCHEDULING API ROUTES ---
 
 @app.route('/api/schedule/list')
@@ -26,15 +95,17 @@ def schedule_list():
     try:
         # Get raw list of schedules (datetimes are converted to ISO strings)
         schedules = lamp_scheduler.get_raw_schedules()
-        return jsonify({'success': True, 'schedules': schedules})
+        return _fj({'success': True, 'schedules': schedules})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/schedule/add', methods=['POST'])
 def schedule_add():
     """Add a new scheduled command."""
     try:
-        data = request.json
+        data = _json_body()
+        if data is None:
+            return _invalid_body()
         action = data['action']
         time_str = data['time'] # Expected format: YYYY-MM-DD HH:MM
         
@@ -51,20 +122,22 @@ def schedule_add():
             duration = int(data.get('duration', 30))
             lamp_scheduler.schedule_effect(time_str, effect_name, duration)
         else:
-            return jsonify({'success': False, 'error': 'Invalid action'}), 400
+            return _fj({'success': False, 'error': 'Invalid action'}, 400)
             
-        return jsonify({'success': True}), 200
+        return _fj({'success': True}, 200)
+    except KeyError as e:
+        return _fj({'success': False, 'error': f"Missing field {e}"}, 400)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
 
 @app.route('/api/schedule/remove/<int:index>', methods=['DELETE'])
 def schedule_remove(index):
     """Remove a scheduled command by 1-based index."""
     try:
         success = lamp_scheduler.remove_schedule(index)
-        return jsonify({'success': success}), 200
+        return _fj({'success': success}, 200)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
 
 # --- Existing Routes ---
 
@@ -79,52 +152,63 @@ def get_status():
     """Get lamp status"""
     try:
         status = lamp_controller.get_status()
-        return jsonify({'success': True, 'status': status})
+        response = _fj({'success': True, 'status': status})
+        # Tag the body so polls with a matching If-None-Match get an empty 304
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
 # (Other API routes like power, color, sync_toggle, effect, etc., remain unchanged)
 
 @app.route('/api/power', methods=['POST'])
 def set_power():
     """Turn lamp on/off"""
     try:
-        data = request.json
-        if data.get('state') == 'on':
+        data = _json_body()
+        if data is None:
+            return _invalid_body()
+        state = data.get('state')
+        if state not in ('on', 'off'):
+            return _fj({'success': False, 'error': "state must be 'on' or 'off'"}, 400)
+        
+        if state == 'on':
             lamp_controller.turn_on()
         else:
             lamp_controller.turn_off()
-        return jsonify({'success': True})
+        return _fj({'success': True})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
+
+
+# /api/color handlers keyed by the request's 'type' field
+_COLOR_DISPATCH = {
+    'hex': lambda data: lamp_controller.set_color_hex(
+        data['value'], brightness=data.get('brightness', 100)),
+    'rgb': lambda data: lamp_controller.set_color_rgb(
+        data['value']['r'], data['value']['g'], data['value']['b'],
+        brightness=data.get('brightness', 100)),
+    'hsv': lambda data: lamp_controller.set_color_hsv(
+        data['value']['h'], data['value']['s'], data['value']['v']),
+}
 
 
 @app.route('/api/color', methods=['POST'])
 def set_color():
     """Set lamp color"""
     try:
-        data = request.json
-        color_type = data.get('type', 'hex')
-        
-        if color_type == 'hex':
-            lamp_controller.set_color_hex(
-                data['value'],
-                brightness=data.get('brightness', 100)
-            )
-        elif color_type == 'rgb':
-            rgb = data['value']
-            lamp_controller.set_color_rgb(
-                rgb['r'], rgb['g'], rgb['b'],
-                brightness=data.get('brightness', 100)
-            )
-        elif color_type == 'hsv':
-            hsv = data['value']
-            lamp_controller.set_color_hsv(
-                hsv['h'], hsv['s'], hsv['v']
-            )
+        data = _json_body()
+        if data is None:
+            return _invalid_body()
+        handler = _COLOR_DISPATCH.get(data.get('type', 'hex'))
+        if handler is None:
+            return _fj({'success': False, 'error': 'Invalid color type'}, 400)
         
-        return jsonify({'success': True})
+        handler(data)
+        return _fj({'success': True})
+    except KeyError as e:
+        return _fj({'success': False, 'error': f"Missing field {e}"}, 400)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
 
 
 @app.route('/api/sync_toggle', methods=['POST'])
@@ -133,80 +217,111 @@ def sync_toggle():
     Starts or stops the Stream Sync mode using the 3-part sequence (ON) or cleanup (OFF).
     """
     try:
-        data = request.json
+        data = _json_body()
+        if data is None:
+            return _invalid_body()
         state = data.get('state') # 'on' or 'off'
+        if state not in ('on', 'off'):
+            return _fj({'success': False, 'error': "state must be 'on' or 'off'"}, 400)
+        
+        if state == 'off':
+            # Stop any running effect so it doesn't keep driving the lamp
+            _stop_effect()
+            
+            # Cleanup Sequence (Toggle OFF -> Return to Colour Mode), done inline since the client waits anyway
+            lamp_controller.set_music_toggle(False)
+            time.sleep(0.5) # Give lamp time to register the toggle off
+            lamp_controller.set_mode('colour') # CRITICAL FIX: Switch out of 'music' mode
+            return _fj({'success': True, 'state': state}, 200)
         
-        def run_sync_toggle():
-            if state == 'on':
-                # Runs the full 3-part sequence (Mode -> Data -> Toggle ON). Duration is None for indefinite run.
-                all_modes['sync'](lamp_controller) 
-            else:
-                # Cleanup Sequence (Toggle OFF -> Return to Colour Mode)
-                lamp_controller.set_music_toggle(False)
-                time.sleep(0.5) # Give lamp time to register the toggle off
-                lamp_controller.set_mode('colour') # CRITICAL FIX: Switch out of 'music' mode
-                
-        thread = threading.Thread(target=run_sync_toggle, daemon=True)
-        thread.start()
-
-        return jsonify({'success': True, 'state': state}), 200
-
-    except KeyError:
-         return jsonify({'success': False, 'error': "Mode 'sync' is not available in src/modes.py"}), 500
+        # Runs the full 3-part sequence (Mode -> Data -> Toggle ON) on the effect worker,
+        # after stopping any running effect so the toggle doesn't queue behind it
+        _submit_effect(stream_sync, lamp_controller)
+
+        return _fj({'success': True, 'state': state}, 200)
+
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
 
 
 @app.route('/api/effect', methods=['POST'])
 def run_effect():
     """Run an effect mode"""
     try:
-        data = request.json
+        data = _json_body()
+        if data is None:
+            return _invalid_body()
         effect_name = data.get('name')
         duration = data.get('duration', 30)
         
         if effect_name not in all_modes:
-            return jsonify({'success': False, 'error': 'Unknown effect'}), 400
+            return _fj({'success': False, 'error': 'Unknown effect'}, 400)
         
         # PREVENT 'sync' from being run here; it has its own toggle endpoint
         if effect_name == 'sync':
-            return jsonify({'success': False, 'error': "Use /api/sync_toggle for sync mode"}), 400
+            return _fj({'success': False, 'error': "Use /api/sync_toggle for sync mode"}, 400)
         
-        # Run effect in background thread so API returns immediately
-        def run():
-            all_modes[effect_name](lamp_controller, duration=duration)
+        # Stop the previous effect and run this one on the worker thread once it has returned,
+        # so the API returns immediately
+        _submit_effect(all_modes[effect_name], lamp_controller, duration=duration)
         
-        thread = threading.Thread(target=run, daemon=True)
-        thread.start()
-        
-        return jsonify({'success': True})
+        return _fj({'success': True})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return _fj({'success': False, 'error': str(e)}, 500)
+
+
+# The effect list never changes at runtime, so its JSON body is built once.
+# 'sync' is filtered out so the UI can handle it separately with the toggle.
+_EFFECTS_JSON = json.dumps({
+    'success': True,
+    'effects': [name for name in all_modes.keys() if name != 'sync']
+}).encode()
+_EFFECTS_ETAG = hashlib.sha1(_EFFECTS_JSON).hexdigest()
 
 
 @app.route('/api/effects')
 def list_effects():
     """List all available effects"""
-    # Filter out 'sync' so the UI can handle it separately with the toggle
-    effects = [name for name in all_modes.keys() if name != 'sync'] 
-    return jsonify({
-        'success': True,
-        'effects': effects
-    })
+    response = Response(_EFFECTS_JSON, mimetype='application/json',
+                        headers={'Cache-Control': 'public, max-age=3600'})
+    # Revalidation after max-age gets an empty 304 while the list is unchanged
+    response.set_etag(_EFFECTS_ETAG)
+    return response.make_conditional(request)
 
 
 def start_web_interface(lamp, host='127.0.0.1', port=5000):
     """Start the Flask web interface and scheduler."""
-    global lamp_controller, lamp_scheduler
+    global lamp_controller, lamp_scheduler, _effect_pool
     lamp_controller = lamp
     lamp_scheduler = LampScheduler(lamp) # Initialize scheduler with the lamp instance
     lamp_scheduler.start() # Start the scheduler thread
     
-    log = logging.getLogger('werkzeug')
-    log.setLevel(logging.ERROR) 
+    # Mode banners are for the terminal CLI; keep them out of the server console
+    logging.getLogger('lava.modes').setLevel(logging.WARNING)
     
     print(f"\n🌐 Web interface starting...")
     print(f"   URL: http://{host}:{port}")
     print("   Press Ctrl+C to stop\n")
     
-    app.run(host=host, port=port, debug=False)
\ No newline at end of file
+    # Waitress serves requests on a thread pool; LAVA_DEV_SERVER=1 (or a missing
+    # waitress install) falls back to Flask's single-process dev server
+    try:
+        if os.environ.get('LAVA_DEV_SERVER') != '1':
+            try:
+                from waitress import serve
+            except ImportError:
+                serve = None
+            if serve is not None:
+                serve(app, host=host, port=port, threads=8)
+                return
+        
+        from werkzeug.serving import WSGIRequestHandler
+        WSGIRequestHandler.log_request = lambda self, *args, **kwargs: None
+        app.run(host=host, port=port, debug=False)
+    finally:
+        # Let a running effect end so the worker thread doesn't hold up interpreter exit,
+        # and leave a fresh pool behind in case the server is started again
+        with _effect_lock:
+            _effect_stop.set()
+            _effect_pool.shutdown(wait=False, cancel_futures=True)
+            _effect_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lava-effect')
\ No newline at end of file
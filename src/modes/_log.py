@@ -0,0 +1,20 @@
+# src/modes/_log.py
+import logging
+import sys
+
+# Shared logger for mode banners and status lines. The CLI shows them on stdout; the web interface
+# raises the level so switching effects doesn't flood the console.
+logger = logging.getLogger('lava.modes')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_RULE = "=" * 60
+
+
+def banner(title):
+    """Logs the boxed demo header at INFO (formatted only when it will be shown)."""
+    logger.info("\n%s\n%s\n%s\n", _RULE, title, _RULE)
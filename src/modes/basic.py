@@ -1,12 +1,11 @@
 # src/modes/basic.py
-import time
+from .palette import pause
+from ._log import banner
 
 
-def demo_basic_colors(lamp, duration=None):
+def demo_basic_colors(lamp, duration=None, stop_event=None):
     """Demo: Cycle through basic colors"""
-    print("\n" + "="*60)
-    print("🌈 DEMO: Basic Colors")
-    print("="*60 + "\n")
+    banner("🌈 DEMO: Basic Colors")
     
     colors = [
         ("#FF0000", "Red"),
@@ -20,6 +19,9 @@ def demo_basic_colors(lamp, duration=None):
     
     lamp.turn_on()
     for hex_color, name in colors:
+        if stop_event is not None and stop_event.is_set():
+            return
         print(f"→ {name}")
         lamp.set_color_hex(hex_color, brightness=100)
-        time.sleep(1.5)
\ No newline at end of file
+        if pause(1.5, stop_event):
+            return
\ No newline at end of file
@@ -1,59 +1,48 @@
 # src/modes/nature.py
-import time
-import random
+from .palette import random_palette, random_intervals, hue_pool
+from ._log import banner
 
+# Sunset hues (purples, pinks, oranges) flattened so each color needs one draw
+_SUNSET_HUES = hue_pool((270, 300), (320, 340), (10, 40))
 
-def demo_fire_effect(lamp, duration=30):
+
+def demo_fire_effect(lamp, duration=30, stop_event=None):
     """Demo: Fire effect (reds, oranges, yellows)"""
-    print("\n" + "="*60)
-    print("🔥 DEMO: Fire Effect")
-    print("="*60 + "\n")
+    banner("🔥 DEMO: Fire Effect")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        h = random.randint(0, 60)
-        s = random.randint(800, 1000)
-        v = random.randint(600, 1000)
-        lamp.set_color_hsv(h, s, v)
-        time.sleep(random.uniform(0.1, 0.3))
+    count = int(duration / 0.1) + 64
+    palette = random_palette(count, range(61), (800, 1000), (600, 1000))
+    intervals = random_intervals(count, 0.1, 0.3)
+    
+    lamp.set_many_raw(palette, intervals, duration, stop_event)
 
 
-def demo_ocean_effect(lamp, duration=30):
+def demo_ocean_effect(lamp, duration=30, stop_event=None):
     """Demo: Ocean effect (blues and greens)"""
-    print("\n" + "="*60)
-    print("🌊 DEMO: Ocean Effect")
-    print("="*60 + "\n")
+    banner("🌊 DEMO: Ocean Effect")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        h = random.randint(150, 240)
-        s = random.randint(600, 1000)
-        v = random.randint(500, 900)
-        lamp.set_color_hsv(h, s, v)
-        time.sleep(random.uniform(0.5, 2.0))
+    count = int(duration / 0.5) + 64
+    palette = random_palette(count, range(150, 241), (600, 1000), (500, 900))
+    intervals = random_intervals(count, 0.5, 2.0)
+    
+    lamp.set_many_raw(palette, intervals, duration, stop_event)
 
 
-def demo_sunset_mode(lamp, duration=30):
+def demo_sunset_mode(lamp, duration=30, stop_event=None):
     """Demo: Sunset colors (purples, pinks, oranges)"""
-    print("\n" + "="*60)
-    print("🌅 DEMO: Sunset Mode")
-    print("="*60 + "\n")
+    banner("🌅 DEMO: Sunset Mode")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        color_ranges = [(270, 300), (320, 340), (10, 40)]
-        h_range = random.choice(color_ranges)
-        h = random.randint(h_range[0], h_range[1])
-        s = random.randint(700, 1000)
-        v = random.randint(600, 900)
-        lamp.set_color_hsv(h, s, v)
-        time.sleep(random.uniform(1.0, 3.0))
\ No newline at end of file
+    count = int(duration / 1.0) + 64
+    palette = random_palette(count, _SUNSET_HUES, (700, 1000), (600, 900))
+    intervals = random_intervals(count, 1.0, 3.0)
+    
+    lamp.set_many_raw(palette, intervals, duration, stop_event)
\ No newline at end of file
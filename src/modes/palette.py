@@ -0,0 +1,42 @@
+# src/modes/palette.py
+import random
+import time
+from src.utils import hsv_to_tuya
+
+# Shared generator for effect modes, so batches skip the module-level random wrappers
+_rng = random.Random()
+
+
+def hue_pool(*hue_ranges):
+    """Flattens inclusive (lo, hi) hue ranges into one tuple to draw hues from."""
+    return tuple(h for lo, hi in hue_ranges for h in range(lo, hi + 1))
+
+
+def random_palette(count, hues, s_range, v_range):
+    """
+    Pre-generates `count` random Tuya color strings so effect loops only index a list.
+    hues is a sequence of hue values (a range or a hue_pool) drawn from uniformly.
+    """
+    choice, randint = _rng.choice, _rng.randint
+    palette = []
+    for _ in range(count):
+        h = choice(hues)
+        s = randint(*s_range)
+        v = randint(*v_range)
+        palette.append(hsv_to_tuya(h, s, v))
+    return palette
+
+
+def random_intervals(count, lo, hi):
+    """Pre-generates `count` random sleep intervals between lo and hi seconds."""
+    uniform = _rng.uniform
+    return [uniform(lo, hi) for _ in range(count)]
+
+
+def pause(seconds, stop_event=None):
+    """Sleeps for `seconds`, waking early and returning True if stop_event gets set."""
+    if stop_event is None:
+        time.sleep(seconds)
+        return False
+    return stop_event.wait(seconds)
+
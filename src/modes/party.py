@@ -1,21 +1,17 @@
 # src/modes/party.py
-import time
-import random
+from .palette import random_palette, random_intervals
+from ._log import banner
 
 
-def demo_party_mode(lamp, duration=30):
+def demo_party_mode(lamp, duration=30, stop_event=None):
     """Demo: Super fast random flashing (party mode)"""
-    print("\n" + "="*60)
-    print("🎉 DEMO: Party Mode (Fast Random Flash)")
-    print("="*60 + "\n")
+    banner("🎉 DEMO: Party Mode (Fast Random Flash)")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        h = random.randint(0, 360)
-        s = 1000
-        v = 1000
-        lamp.set_color_hsv(h, s, v)
-        time.sleep(random.uniform(0.05, 0.2))
\ No newline at end of file
+    count = int(duration / 0.05) + 64
+    palette = random_palette(count, range(361), (1000, 1000), (1000, 1000))
+    intervals = random_intervals(count, 0.05, 0.2)
+    
+    lamp.set_many_raw(palette, intervals, duration, stop_event)
\ No newline at end of file
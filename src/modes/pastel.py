@@ -1,21 +1,15 @@
 # src/modes/pastel.py
-import time
-import random
+from .palette import random_palette
+from ._log import banner
 
 
-def demo_pastel_mode(lamp, duration=30, interval=2.0):
+def demo_pastel_mode(lamp, duration=30, interval=2.0, stop_event=None):
     """Demo: Soft pastel colors"""
-    print("\n" + "="*60)
-    print("🌸 DEMO: Pastel Mode (Soft Colors)")
-    print("="*60 + "\n")
+    banner("🌸 DEMO: Pastel Mode (Soft Colors)")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        h = random.randint(0, 360)
-        s = random.randint(200, 500)
-        v = random.randint(700, 1000)
-        lamp.set_color_hsv(h, s, v)
-        time.sleep(interval)
\ No newline at end of file
+    palette = random_palette(int(duration / interval) + 1, range(361), (200, 500), (700, 1000))
+    
+    lamp.set_many_raw(palette, (interval,), duration, stop_event)
\ No newline at end of file
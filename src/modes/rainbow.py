@@ -1,35 +1,29 @@
 # src/modes/rainbow.py
-import time
-import random
+from src.utils import RAINBOW_LUT
+from .palette import random_palette
+from ._log import banner
 
+# Smooth rainbow sequence: every 5th hue of the full-brightness table
+_RAINBOW_FRAMES = RAINBOW_LUT[::5]
 
-def demo_rainbow(lamp, duration=None):
+
+def demo_rainbow(lamp, duration=None, stop_event=None):
     """Demo: Smooth rainbow transition"""
-    print("\n" + "="*60)
-    print("🌈 DEMO: Rainbow Cycle (Smooth)")
-    print("="*60 + "\n")
+    banner("🌈 DEMO: Rainbow Cycle (Smooth)")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    for h in range(0, 360, 5):
-        lamp.set_color_hsv(h, 1000, 1000)
-        time.sleep(0.1)
+    lamp.set_many_raw(_RAINBOW_FRAMES, (0.1,), stop_event=stop_event)
 
 
-def demo_random_rainbow(lamp, duration=30, interval=1.0):
+def demo_random_rainbow(lamp, duration=30, interval=1.0, stop_event=None):
     """Demo: Random vibrant colors"""
-    print("\n" + "="*60)
-    print("🎲 DEMO: Random Rainbow")
-    print("="*60 + "\n")
+    banner("🎲 DEMO: Random Rainbow")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        h = random.randint(0, 360)
-        s = random.randint(800, 1000)
-        v = random.randint(800, 1000)
-        lamp.set_color_hsv(h, s, v)
-        time.sleep(interval)
\ No newline at end of file
+    palette = random_palette(int(duration / interval) + 1, range(361), (800, 1000), (800, 1000))
+    
+    lamp.set_many_raw(palette, (interval,), duration, stop_event)
\ No newline at end of file
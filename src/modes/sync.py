@@ -1,63 +1,75 @@
-import time
 import struct
+from functools import lru_cache
+from .palette import pause
+from ._log import logger
 # Placeholder: assumes LavaLampController is available via the structure
 
 # --- Helper function used for building the scene string ---
-def _build_music_scene_string(colors, duration=60):
+
+def _scene_layout(count, timed):
+    """Header (+ 2-byte duration when timed) + 3 x uint16 per color."""
+    return ('>BBBBH' if timed else '>BBBB') + 'HHH' * count
+
+
+# Precompiled scene layouts keyed by (color count, has duration)
+_SCENE_STRUCTS = {(n, timed): struct.Struct(_scene_layout(n, timed)) for n in (1, 2) for timed in (False, True)}
+
+
+def _scene_struct(count, timed):
+    """Returns (and caches) the packer for a scene with `count` colors."""
+    packer = _SCENE_STRUCTS.get((count, timed))
+    if packer is None:
+        packer = _SCENE_STRUCTS[(count, timed)] = struct.Struct(_scene_layout(count, timed))
+    return packer
+
+
+@lru_cache(maxsize=32)
+def build_music_scene_string(colors, duration_units=None):
     """
-    Builds the minimal scene string for 'music' mode activation.
+    Builds the scene string for 'music' mode activation.
+    `colors` must be a tuple of (h, s, v) tuples so results can be cached.
     [ID=00][Count][Mode=01][Pad=00][Color Data (6 bytes each)]
+    With duration_units (0.1s units) the captured cycling layout is used instead:
+    [ID=00][Count][Mode=01][Pad=00][Duration (2-byte)][Color Data (6 bytes each)]
     """
-    scene = bytearray()
+    # Color Data (HSV, 2 bytes each, Big Endian)
+    flat_hsv = [c for color in colors for c in color]
     
-    # --- MINIMAL HEADER ---
-    scene.append(0x00)  # ID/Version
-    scene.append(len(colors))  # Color count (e.g., 0x01 for 1 color)
-    scene.append(0x01)  # Mode: 0x01 is the magic byte for JUMP/MUSIC cycling!
-    scene.append(0x00)  # Padding/Flags
-    
-    # --- Color Data (HSV, 2 bytes each, Big Endian) ---
-    for h, s, v in colors:
-        scene.extend(struct.pack('>H', h))
-        scene.extend(struct.pack('>H', s))
-        scene.extend(struct.pack('>H', v))
-    
-    return scene.hex()
+    # Header: ID/Version, color count, Mode 0x01 (JUMP/MUSIC cycling), padding
+    header = (0x00, len(colors), 0x01, 0x00)
+    if duration_units is not None:
+        header += (min(duration_units, 65535),)
+    return _scene_struct(len(colors), duration_units is not None).pack(*header, *flat_hsv).hex()
+
+
+# Single stable color (Red) used for the minimal DPS 25 packet, built once at import
+_RED_MUSIC_SCENE_HEX = build_music_scene_string(((0, 1000, 1000),))
 
 
 # THE SYNC FUNCTION
-def stream_sync(lamp):
+def stream_sync(lamp, stop_event=None):
     """
-    Activates the single-command 'Stream Sync' mode (ON) or deactivates it (OFF).
-    If duration is provided, it runs for that duration, then cleans up.
+    Activates the single-command 'Stream Sync' mode.
+    Stops between steps once stop_event is set.
     """
-    print("\n🎧 Activating Stream Sync Mode...")
-    
-    # Use a single, stable color (Red) for the minimal DPS 25 packet
-    colors = [(0, 1000, 1000)]
+    logger.info("\n🎧 Activating Stream Sync Mode...")
     
-    scene_hex = _build_music_scene_string(colors)
+    scene_hex = _RED_MUSIC_SCENE_HEX
     
     try:
         # 1. Set mode to 'music' (DPS 21)
         lamp.set_mode('music') 
-        time.sleep(0.5)
+        if pause(0.5, stop_event):
+            return
         
         # 2. Send the minimal structured command (DPS 25)
         lamp.set_scene_raw(scene_hex)
-        time.sleep(0.5)
+        if pause(0.5, stop_event):
+            return
         
         # 3. TOGGLE THE MUSIC STATE FLAG (DPS 27) - The 'GO' button
         lamp.set_music_toggle(True)
-        print(f"✅ Stream Sync mode activated.")
-        
-        # Cleanup logic for scheduled runs
-        # if duration is not None:
-        #      time.sleep(duration)
-        #      lamp.set_music_toggle(False)
-        #      # CRITICAL FIX: Switch back to a standard mode after disabling toggle
-        #      lamp.set_mode('colour')
-        #      print("⏯️  Stream Sync mode toggle deactivated and set back to 'colour' mode.")
+        logger.info("✅ Stream Sync mode activated.")
 
     except Exception as e:
-        print(f"❌ Failed to activate sync mode: {e}")
\ No newline at end of file
+        logger.error("❌ Failed to activate sync mode: %s", e)
\ No newline at end of file
@@ -1,57 +1,68 @@
 # src/modes/utility.py
 import time
+from functools import lru_cache
+from src.utils import RAINBOW_LUT, hsv_to_tuya
+from .palette import pause
+from ._log import banner
 
+# Precomputed Tuya color strings for the police siren
+POLICE_RED = RAINBOW_LUT[0]
+POLICE_BLUE = RAINBOW_LUT[240]
+_POLICE_FRAMES = (POLICE_RED, POLICE_BLUE)
 
-def demo_breathing(lamp, color="#FF0000", cycles=3, duration=None):
+
+@lru_cache(maxsize=16)
+def _breathing_frames(h, s):
+    """Precomputes one fade-in/fade-out cycle of Tuya color strings for a hue/saturation."""
+    values = list(range(100, 1001, 50)) + list(range(1000, 99, -50))
+    return tuple(hsv_to_tuya(h, s, v) for v in values)
+
+
+def demo_breathing(lamp, color="#FF0000", cycles=3, duration=None, stop_event=None):
     """Demo: Breathing effect"""
     from src.utils import hex_to_hsv
     
-    print("\n" + "="*60)
-    print("💨 DEMO: Breathing Effect")
-    print("="*60 + "\n")
+    banner("💨 DEMO: Breathing Effect")
     
     lamp.turn_on()
-    hsv = hex_to_hsv(color)
+    h, s, _ = hex_to_hsv(color)
+    frames = _breathing_frames(h, s)
     
-    for _ in range(cycles):
-        for v in range(100, 1001, 50):
-            lamp.set_color_hsv(hsv['h'], hsv['s'], v)
-            time.sleep(0.05)
-        for v in range(1000, 99, -50):
-            lamp.set_color_hsv(hsv['h'], hsv['s'], v)
-            time.sleep(0.05)
+    lamp.set_many_raw(frames * cycles, (0.05,), stop_event=stop_event)
 
 
-def demo_strobe(lamp, color="#FFFFFF", duration=5):
+def demo_strobe(lamp, color="#FFFFFF", duration=5, stop_event=None):
     """Demo: Strobe effect"""
-    print("\n" + "="*60)
-    print("⚡ DEMO: Strobe Effect")
-    print("="*60 + "\n")
+    banner("⚡ DEMO: Strobe Effect")
+    
+    from src.utils import hex_to_hsv
     
     lamp.turn_on()
     lamp.set_color_hex(color, brightness=100)
+    h, s, _ = hex_to_hsv(color)
+    frame = hsv_to_tuya(h, s, 1000)
     
+    # Flash with quiet writes: no per-command confirmations, and lamp.verbose
+    # (shared with the CLI, web and scheduler threads) is left alone
     start = time.time()
     while time.time() - start < duration:
-        lamp.turn_off()
-        time.sleep(0.1)
-        lamp.turn_on()
-        lamp.set_color_hex(color, brightness=100)
-        time.sleep(0.1)
+        if stop_event is not None and stop_event.is_set():
+            return
+        lamp.turn_off(quiet=True)
+        if pause(0.1, stop_event):
+            return
+        lamp.turn_on(quiet=True)
+        lamp.set_color_raw(frame, quiet=True)
+        if pause(0.1, stop_event):
+            return
 
 
-def demo_police_lights(lamp, duration=30):
+def demo_police_lights(lamp, duration=30, stop_event=None):
     """Demo: Police siren (red/blue alternating)"""
-    print("\n" + "="*60)
-    print("🚨 DEMO: Police Lights")
-    print("="*60 + "\n")
+    banner("🚨 DEMO: Police Lights")
     
     lamp.turn_on()
     lamp.set_mode('colour')
     
-    start = time.time()
-    while time.time() - start < duration:
-        lamp.set_color_hsv(0, 1000, 1000)
-        time.sleep(0.3)
-        lamp.set_color_hsv(240, 1000, 1000)
-        time.sleep(0.3)
\ No newline at end of file
+    # Alternate the two precomputed packets on a fixed 0.3 s cadence
+    lamp.set_many_raw(_POLICE_FRAMES, (0.3,), duration, stop_event)
\ No newline at end of file
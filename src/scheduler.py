@@ -1,19 +1,97 @@
 import time
+import heapq
+import itertools
+import re
 import threading
+from functools import lru_cache
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime, timedelta
 from src.modes import all_modes
+from src.utils import hex_to_hsv
 import json
 import os
+import atexit
+import tempfile
+
+try:
+    import orjson  # Optional: faster reads/writes of the schedule file
+except ImportError:
+    orjson = None
 
 # Define the file path for persistent schedules
 SCHEDULE_FILE = 'schedules.json'
 
+
+def _timed(mode):
+    """Adapts a mode function to the scheduler's runner(lamp, duration) call."""
+    return lambda lamp, duration: mode(lamp, duration=duration)
+
+
+# Scheduled effect dispatch table: effect name -> runner(lamp, duration).
+# Duration is passed by keyword since some modes (breathing, strobe) take other
+# positional arguments first; stream sync takes no duration at all.
+_EFFECT_MAP = {name: _timed(mode) for name, mode in all_modes.items()}
+_EFFECT_MAP['sync'] = lambda lamp, duration: all_modes['sync'](lamp)
+
+# "HH:MM", "MM-DD HH:MM" or "YYYY-MM-DD HH:MM"
+_TIME_RE = re.compile(r'(?:(?:(\d{4})-)?(\d{2})-(\d{2})\s+)?(\d{2}):(\d{2})')
+
+
+@lru_cache(maxsize=128)
+def _split_time_string(time_str):
+    """Splits a schedule time string into (year, month, day, hour, minute); date parts may be None."""
+    match = _TIME_RE.fullmatch(time_str)
+    if match is None:
+        raise ValueError(f"Invalid time format: {time_str}")
+    return tuple(int(part) if part is not None else None for part in match.groups())
+
+
+@dataclass(slots=True)
+class Schedule:
+    """A single scheduled lamp action. h/s/v hold the precomputed color for 'on' actions."""
+    time: datetime
+    action: str
+    color: str = "#FFFFFF"
+    brightness: int = 100
+    effect: str | None = None
+    duration: int | None = None
+    h: int | None = None
+    s: int | None = None
+    v: int | None = None
+    
+    def to_json_dict(self):
+        """
+        Plain dict with the time as an ISO string, for schedules.json and the web API.
+        Only fields that apply to the action are included (no color on 'off', no null h/s/v).
+        """
+        data = {k: v for k, v in asdict(self).items() if v is not None}
+        if self.action != 'on':
+            data.pop('color', None)
+            data.pop('brightness', None)
+        data['time'] = self.time.isoformat()
+        return data
+
+
+_SCHEDULE_FIELDS = frozenset(f.name for f in fields(Schedule))
+
+
 class LampScheduler:
     """Schedule lamp actions at specific times"""
     
+    # Seconds after its time that a due schedule may still fire; later ones count as missed
+    MISSED_WINDOW = 60
+    # Seconds the running scheduler waits after a change before rewriting the file, so bursts save once
+    SAVE_DELAY = 0.5
+    
     def __init__(self, lamp):
         self.lamp = lamp
-        self.schedules = []
+        # Min-heap of (epoch_ts, seq, schedule); seq breaks ties so Schedules are never compared
+        self._heap = []
+        self._seq = itertools.count()
+        self._sorted_cache = None  # Heap entries in firing order; reset whenever the heap changes
+        self._lock = threading.Lock()
+        self._wake = threading.Event()  # Set whenever the heap changes or the scheduler stops
+        self._dirty_since = None  # Monotonic time of the first unsaved change, or None when saved
         self.running = False
         self.thread = None
         self._load_schedules() # Load schedules on startup
@@ -24,30 +102,82 @@ class LampScheduler:
         """Loads schedules from the JSON file."""
         if os.path.exists(SCHEDULE_FILE):
             try:
-                with open(SCHEDULE_FILE, 'r') as f:
-                    data = json.load(f)
-                    self.schedules = []
-                    for item in data:
-                        # Convert ISO string back to datetime object
+                with open(SCHEDULE_FILE, 'rb') as f:
+                    raw = f.read()
+                data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                heap = []
+                for index, item in enumerate(data, 1):
+                    try:
+                        # Convert ISO string back to datetime object; ignore keys Schedule doesn't know
                         item['time'] = datetime.fromisoformat(item['time'])
-                        self.schedules.append(item)
-                print(f"✅ Loaded {len(self.schedules)} schedules.")
+                        schedule = Schedule(**{k: v for k, v in item.items() if k in _SCHEDULE_FIELDS})
+                    except (KeyError, TypeError, ValueError) as e:
+                        # One malformed entry (e.g. a legacy one without 'action') shouldn't drop the rest
+                        print(f"⚠️ Skipping invalid schedule #{index}: {e}")
+                        continue
+                    heap.append((schedule.time.timestamp(), next(self._seq), schedule))
+                heapq.heapify(heap)
+                self._heap = heap
+                self._sorted_cache = None
+                print(f"✅ Loaded {len(self._heap)} schedules.")
             except Exception as e:
                 print(f"⚠️ Failed to load schedules: {e}")
     
     def _save_schedules(self):
-        """Saves current schedules to the JSON file."""
+        """Saves current schedules to the JSON file, replacing it atomically."""
         try:
-            # Convert datetime objects to ISO format strings for JSON serialization
-            data = [
-                {k: v.isoformat() if isinstance(v, datetime) else v for k, v in schedule.items()}
-                for schedule in self.schedules
-            ]
-            with open(SCHEDULE_FILE, 'w') as f:
-                json.dump(data, f, indent=4)
+            schedules = self._sorted()
+            data = [schedule.to_json_dict() for schedule in schedules]
+            if orjson is not None:
+                payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+            else:
+                payload = json.dumps(data, indent=4).encode()
+            
+            # Write beside the target and swap it in, so a crash never leaves a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(SCHEDULE_FILE)),
+                                            prefix='.schedules-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, SCHEDULE_FILE)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
         except Exception as e:
             print(f"❌ Failed to save schedules: {e}")
     
+    def _mark_dirty(self):
+        """Records an unsaved change; saves now unless the scheduler thread will batch it."""
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        if not self.running:
+            self._flush()
+    
+    def _flush(self):
+        """Writes pending changes to disk, if there are any."""
+        if self._dirty_since is not None:
+            self._dirty_since = None
+            self._save_schedules()
+    
+    def _sorted_entries(self):
+        """Returns heap entries ordered by firing time, re-sorting only after a change. Caller holds _lock."""
+        if self._sorted_cache is None:
+            self._sorted_cache = sorted(self._heap)
+        return self._sorted_cache
+    
+    def _sorted(self):
+        """Returns the Schedule objects ordered by firing time."""
+        with self._lock:
+            return [entry[2] for entry in self._sorted_entries()]
+    
+    def _add(self, schedule):
+        """Pushes a schedule onto the heap, persists it and wakes the scheduler thread."""
+        with self._lock:
+            heapq.heappush(self._heap, (schedule.time.timestamp(), next(self._seq), schedule))
+            self._sorted_cache = None
+        self._mark_dirty()
+        self._wake.set()
+    
     # --- Scheduling Methods ---
     
     def schedule_on(self, target_time, color="#FFFFFF", brightness=100):
@@ -55,14 +185,19 @@ class LampScheduler:
         if isinstance(target_time, str):
             target_time = self._parse_time_string(target_time)
         
-        schedule = {
-            'time': target_time,
-            'action': 'on',
-            'color': color,
-            'brightness': brightness
-        }
-        self.schedules.append(schedule)
-        self._save_schedules()
+        # Resolve the color now so a bad hex fails at scheduling time, not when it fires
+        h, s, _ = hex_to_hsv(color)
+        
+        schedule = Schedule(
+            time=target_time,
+            action='on',
+            color=color,
+            brightness=brightness,
+            h=h,
+            s=s,
+            v=max(1, min(1000, int((brightness / 100) * 1000)))
+        )
+        self._add(schedule)
         print(f"✅ Scheduled: Turn ON at {target_time.strftime('%Y-%m-%d %H:%M:%S')} with color {color}")
         return schedule
     
@@ -71,12 +206,8 @@ class LampScheduler:
         if isinstance(target_time, str):
             target_time = self._parse_time_string(target_time)
         
-        schedule = {
-            'time': target_time,
-            'action': 'off'
-        }
-        self.schedules.append(schedule)
-        self._save_schedules()
+        schedule = Schedule(time=target_time, action='off')
+        self._add(schedule)
         print(f"✅ Scheduled: Turn OFF at {target_time.strftime('%Y-%m-%d %H:%M:%S')}")
         return schedule
 
@@ -85,48 +216,38 @@ class LampScheduler:
         if isinstance(target_time, str):
             target_time = self._parse_time_string(target_time)
         
-        schedule = {
-            'time': target_time,
-            'action': 'effect',
-            'effect': 'sync', # Fixed effect name
-        }
-        self.schedules.append(schedule)
-        self._save_schedules()
+        schedule = Schedule(time=target_time, action='effect', effect='sync') # Fixed effect name
+        self._add(schedule)
         print(f"✅ Scheduled: Stream SYNC at {target_time.strftime('%Y-%m-%d %H:%M:%S')}")
         return schedule
     
     def schedule_effect(self, target_time, effect_name, duration=30):
         """Schedule an effect (non-sync) to run at a specific time"""
         if effect_name == 'sync':
-             return self.schedule_sync(target_time, duration)
+             return self.schedule_sync(target_time)
 
         if isinstance(target_time, str):
             target_time = self._parse_time_string(target_time)
         
-        schedule = {
-            'time': target_time,
-            'action': 'effect',
-            'effect': effect_name,
-            'duration': duration
-        }
-        self.schedules.append(schedule)
-        self._save_schedules()
+        schedule = Schedule(time=target_time, action='effect', effect=effect_name, duration=duration)
+        self._add(schedule)
         print(f"✅ Scheduled: {effect_name} effect at {target_time.strftime('%Y-%m-%d %H:%M:%S')} for {duration}s")
         return schedule
     
     def remove_schedule(self, index):
         """Remove a schedule by 1-based index (for CLI)"""
         try:
-            # Sort schedules by time to ensure the index matches the CLI/UI list order
-            sorted_schedules = sorted(self.schedules, key=lambda x: x['time'])
+            with self._lock:
+                # Sort entries by time to ensure the index matches the CLI/UI list order
+                entry = self._sorted_entries()[index - 1]
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+                self._sorted_cache = None
+            schedule_to_remove = entry[2]
             
-            # Get the schedule object using the 1-based index
-            schedule_to_remove = sorted_schedules[index - 1]
-            
-            # Find and remove the original object from the unsorted list
-            self.schedules.remove(schedule_to_remove)
-            self._save_schedules()
-            print(f"🗑️ Removed schedule at {schedule_to_remove['time'].strftime('%H:%M')} ({schedule_to_remove['action']})")
+            self._mark_dirty()
+            self._wake.set()
+            print(f"🗑️ Removed schedule at {schedule_to_remove.time.strftime('%H:%M')} ({schedule_to_remove.action})")
             return True
             
         except IndexError:
@@ -139,26 +260,18 @@ class LampScheduler:
 
     def _parse_time_string(self, time_str):
         """Parse time string to datetime object"""
+        year, month, day, hour, minute = _split_time_string(time_str)
         now = datetime.now()
         
-        # Format: "HH:MM" (today)
-        if len(time_str) == 5 and ':' in time_str:
-            hour, minute = map(int, time_str.split(':'))
+        # Format: "HH:MM" (today, or tomorrow if that time has passed)
+        if month is None:
             target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
             if target < now:
                 target += timedelta(days=1)
             return target
         
-        # Format: "YYYY-MM-DD HH:MM"
-        elif len(time_str) >= 16:
-            return datetime.strptime(time_str, "%Y-%m-%d %H:%M")
-        
-        # Format: "MM-DD HH:MM" (this year)
-        elif len(time_str) == 11:
-            return datetime.strptime(f"{now.year}-{time_str}", "%Y-%m-%d %H:%M")
-        
-        else:
-            raise ValueError(f"Invalid time format: {time_str}")
+        # Format: "YYYY-MM-DD HH:MM", or "MM-DD HH:MM" (this year)
+        return datetime(year or now.year, month, day, hour, minute)
     
     # --- Thread Management ---
 
@@ -169,102 +282,127 @@ class LampScheduler:
             return
         
         self.running = True
+        self._wake.clear()
+        # The worker batches saves; make sure a pending one still lands if the process exits
+        atexit.register(self._flush)
         self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.thread.start()
-        print("🕐 Scheduler started! Checking every 1s.")
+        print("🕐 Scheduler started! Sleeping until the next scheduled action.")
     
     def stop(self):
         """Stop the scheduler"""
         self.running = False
+        self._wake.set()
         if self.thread:
             self.thread.join(timeout=2)
+        atexit.unregister(self._flush)
+        self._flush()
         print("⏹️  Scheduler stopped!")
     
     def _run_scheduler(self):
-        """Background thread that checks schedules"""
+        """Background thread that sleeps until the earliest schedule is due"""
         while self.running:
-            now = datetime.now()
+            with self._lock:
+                timeout = self._heap[0][0] - time.time() if self._heap else None
             
-            # Sort schedules to handle execution order correctly
-            sorted_schedules = sorted(self.schedules, key=lambda x: x['time'])
-
-            for schedule in sorted_schedules[:]:
-                # Check for time match (use a small window around the minute for robustness)
-                if now >= schedule['time'] and now < schedule['time'] + timedelta(seconds=60): 
-                    print(f"\n⏰ Executing scheduled action at {now.strftime('%H:%M:%S')}")
-                    
-                    # Assume we should remove the schedule unless it is an indefinite effect
-                    remove_schedule = True
-                    
-                    try:
-                        # 1. Guarantee lamp is ON before any action (except off)
-                        if schedule['action'] != 'off':
-                             self.lamp.turn_on()
-                             time.sleep(0.1) 
+            # Save batched changes once SAVE_DELAY has passed since the first of them
+            dirty_since = self._dirty_since
+            if dirty_since is not None:
+                save_in = dirty_since + self.SAVE_DELAY - time.monotonic()
+                if save_in <= 0:
+                    self._flush()
+                elif timeout is None or save_in < timeout:
+                    timeout = save_in
+            
+            if timeout is None or timeout > 0:
+                # Sleep until the next schedule is due, the next save, or until the heap changes
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+            
+            # Pop every schedule that is due (heap entries already carry the epoch time)
+            due = []
+            with self._lock:
+                now_ts = time.time()
+                while self._heap and self._heap[0][0] <= now_ts:
+                    due.append(heapq.heappop(self._heap))
+                self._sorted_cache = None
+            
+            window = self.MISSED_WINDOW
+            for target_ts, _, schedule in due:
+                now_ts = time.time()
+                # Only fire within a small window after the scheduled minute; stale entries are dropped
+                if now_ts < target_ts + window:
+                    print(f"\n⏰ Executing scheduled action at {datetime.fromtimestamp(now_ts).strftime('%H:%M:%S')}")
+                    self._execute(schedule)
+                else:
+                    print(f"\n⚠️  Skipping missed schedule from {schedule.time.strftime('%Y-%m-%d %H:%M')}")
+            
+            # Remove completed schedules from disk (batched with any other pending changes)
+            self._mark_dirty()
+    
+    def _execute(self, schedule):
+        """Runs a single scheduled action against the lamp."""
+        try:
+            # 1. Guarantee lamp is ON before any action (except off)
+            if schedule.action != 'off':
+                 self.lamp.turn_on()
+                 time.sleep(0.1) 
 
-                        # 2. Execute Action
-                        if schedule['action'] == 'on':
-                            self.lamp.set_color_hex(schedule['color'], schedule['brightness'])
-                            print(f"   ✅ Lamp turned ON with color {schedule['color']}")
-                        
-                        elif schedule['action'] == 'off':
-                            self.lamp.turn_off()
-                            print(f"   ✅ Lamp turned OFF")
-                        
-                        elif schedule['action'] == 'effect':
-                            effect = schedule['effect']
-                            # Use .get() to safely check for duration, defaulting to a non-zero value if missing
-                            duration = schedule.get('duration') 
-                            
-                            if effect in all_modes:
-                                
-                                # --- NEW LOGIC FOR INDEFINITE SYNC ---
-                                # If the action is sync AND duration is None/0 (meaning indefinitely scheduled)
-                                if effect == 'sync' and not duration:
-                                    # Execute the ON sequence for Stream Sync (duration=None runs indefinitely)
-                                    all_modes[effect](self.lamp)
-                                    print(f"   ✅ Running {effect.upper()} effect INDEFINITELY.")
-                                    # Schedule should still be removed after execution - it's a one-time trigger
-                                    remove_schedule = True
-                                
-                                else:
-                                    # Execute standard timed effect (including timed sync from CLI)
-                                    all_modes[effect](self.lamp, duration)
-                                    print(f"   ✅ Running {effect.upper()} effect for {duration}s")
-                            else:
-                                print(f"   ❌ Error: Effect '{effect}' not found in modes.")
-                    
-                    except Exception as e:
-                        print(f"   ❌ Error executing schedule: {e}")
-                    
-                    # 3. Remove completed schedule
-                    if remove_schedule:
-                        self.schedules.remove(schedule)
-                        self._save_schedules()
+            # 2. Execute Action
+            if schedule.action == 'on':
+                if schedule.h is not None:
+                    self.lamp.set_color_hsv(schedule.h, schedule.s, schedule.v)
+                else:
+                    # Schedules saved before HSV was precomputed only carry the hex color
+                    self.lamp.set_color_hex(schedule.color, schedule.brightness)
+                print(f"   ✅ Lamp turned ON with color {schedule.color}")
+            
+            elif schedule.action == 'off':
+                self.lamp.turn_off()
+                print(f"   ✅ Lamp turned OFF")
             
-            time.sleep(1)
+            elif schedule.action == 'effect':
+                effect = schedule.effect
+                duration = schedule.duration
+                
+                runner = _EFFECT_MAP.get(effect)
+                
+                if runner is None:
+                    print(f"   ❌ Error: Effect '{effect}' not found in modes.")
+                else:
+                    runner(self.lamp, duration)
+                    if effect == 'sync' and not duration:
+                        # Stream Sync is a one-time trigger that keeps running on the lamp
+                        print(f"   ✅ Running {effect.upper()} effect INDEFINITELY.")
+                    else:
+                        print(f"   ✅ Running {effect.upper()} effect for {duration}s")
+        
+        except Exception as e:
+            print(f"   ❌ Error executing schedule: {e}")
     
     # --- UI/CLI Display Methods ---
 
     def list_schedules(self):
         """Show all scheduled actions (formatted for CLI)"""
-        if not self.schedules:
+        sorted_schedules = self._sorted()
+        if not sorted_schedules:
             return "\n📋 No schedules set"
         
         output = ["\n📋 Scheduled Actions:", "="*60]
         
-        sorted_schedules = sorted(self.schedules, key=lambda x: x['time'])
-        
         for i, schedule in enumerate(sorted_schedules, 1):
-            time_str = schedule['time'].strftime('%Y-%m-%d %H:%M:%S')
-            action = schedule['action']
+            time_str = schedule.time.strftime('%Y-%m-%d %H:%M:%S')
+            action = schedule.action
             
             if action == 'on':
-                details = f"Turn ON ({schedule['color']} @ {schedule['brightness']}%)"
+                details = f"Turn ON ({schedule.color} @ {schedule.brightness}%)"
             elif action == 'off':
                 details = "Turn OFF"
             elif action == 'effect':
-                details = f"{schedule['effect'].upper()} effect ({schedule['duration']}s)"
+                details = f"{schedule.effect.upper()} effect"
+                if schedule.duration is not None:
+                    details += f" ({schedule.duration}s)"
             else:
                 details = "Unknown Action"
                 
@@ -275,18 +413,17 @@ class LampScheduler:
     
     def clear_schedules(self):
         """Clear all schedules"""
-        self.schedules.clear()
-        self._save_schedules()
+        with self._lock:
+            self._heap.clear()
+            self._sorted_cache = None
+        self._mark_dirty()
+        self._wake.set()
         print("🗑️  All schedules cleared!")
 
     def get_raw_schedules(self):
         """Returns the raw list of schedules for GUI serialization."""
         # Must serialize datetime objects to ISO strings
-        sorted_schedules = sorted(self.schedules, key=lambda x: x['time'])
-        return [
-            {k: v.isoformat() if isinstance(v, datetime) else v for k, v in schedule.items()}
-            for schedule in sorted_schedules
-        ]
+        return [schedule.to_json_dict() for schedule in self._sorted()]
 
 
 def schedule_mode(lamp):
@@ -1,6 +1,14 @@
 # src/utils.py
 import colorsys
 import re
+import struct
+from functools import lru_cache
+
+# Packs Tuya HSV components as three big-endian uint16s (hhhhssssvvvv once hex-encoded)
+_HSV_STRUCT = struct.Struct('>HHH')
+
+# Six hex digits, no leading '#'
+_HEX6 = re.compile(r'[0-9a-fA-F]{6}')
 
 
 class InvalidHexError(Exception):
@@ -8,38 +16,65 @@ class InvalidHexError(Exception):
     pass
 
 
-def hex_to_hsv(hex_color: str) -> dict:
+@lru_cache(maxsize=512)
+def hex_to_hsv(hex_color: str) -> tuple[int, int, int]:
     """
-    Convert #RRGGBB to standard HSV dictionary (h: 0-360, s: 0-1000, v: 0-1000).
+    Convert #RRGGBB to a standard HSV tuple (h: 0-360, s: 0-1000, v: 0-1000).
+    Results are cached, since effects and schedules reuse a small set of colors.
     """
     hex_color = hex_color.lstrip('#')
-    if not re.fullmatch(r'^[0-9a-fA-F]{6}$', hex_color):
+    if not _HEX6.fullmatch(hex_color):
         raise InvalidHexError(f"Invalid hex color format: {hex_color}")
         
-    r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
+    r, g, b = bytes.fromhex(hex_color)
+    return _rgb_to_hsv_int(r, g, b)
+
+
+def _rgb_to_hsv_int(r: int, g: int, b: int) -> tuple[int, int, int]:
+    """Integer-only RGB (0-255) to Tuya HSV (0-360, 0-1000, 0-1000) conversion."""
+    mx = max(r, g, b)
+    mn = min(r, g, b)
+    d = mx - mn
+    
+    if d == 0:
+        h = 0
+    elif mx == r:
+        h = ((g - b) * 60) // d % 360
+    elif mx == g:
+        h = ((b - r) * 60) // d + 120
+    else:
+        h = ((r - g) * 60) // d + 240
     
-    return {
-        'h': int(h * 360),
-        's': int(s * 1000),
-        'v': int(v * 1000)
-    }
+    s = (d * 1000) // mx if mx else 0
+    v = (mx * 1000) // 255
+    return h, s, v
+
+# 4-char hex for every value a Tuya HSV component can take (0-1000)
+_HEX4 = tuple(f"{i:04x}" for i in range(1001))
 
 def hsv_to_tuya(h: int, s: int, v: int) -> str:
     """
     Convert HSV (h: 0-360, s: 0-1000, v: 0-1000) to Tuya color data string.
     Format: hhhhssssvvvv (4-char hex for each component).
+    DP values travel inside tinytuya's JSON payload, so the hex string (not raw bytes)
+    is what DPS 24 needs; in-range components are three lookups in a precomputed table.
     """
-    return f"{h:04x}{s:04x}{v:04x}"
+    if h >= 0 and s >= 0 and v >= 0:
+        try:
+            return _HEX4[h] + _HEX4[s] + _HEX4[v]
+        except IndexError:
+            pass
+    # Out-of-range components go through struct, which still rejects anything past uint16
+    return _HSV_STRUCT.pack(h, s, v).hex()
+
+# Full-saturation, full-brightness Tuya color strings indexed by hue (0-359)
+RAINBOW_LUT = tuple(hsv_to_tuya(h, 1000, 1000) for h in range(360))
 
+@lru_cache(maxsize=1024)
 def rgb_to_tuya_hsv(r: int, g: int, b: int) -> tuple[int, int, int]:
     """Convert RGB (0-255) to Tuya HSV components (0-360, 0-1000, 0-1000)."""
-    h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
-    h_tuya = int(h * 360)
-    s_tuya = int(s * 1000)
-    v_tuya = int(v * 1000)
-    return h_tuya, s_tuya, v_tuya
-    
+    return _rgb_to_hsv_int(r, g, b)
+
 def _hsv_to_hex_display(h: int, s: int, v: int) -> str:
     """Helper to convert Tuya HSV back to hex for display/status reporting."""
     r, g, b = colorsys.hsv_to_rgb(h/360, s/1000, v/1000)